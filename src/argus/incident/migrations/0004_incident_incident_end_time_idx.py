@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('argus_incident', '0003_incident_level'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(condition=models.Q(('end_time__isnull', False)), fields=['end_time'], name='incident_end_time_idx'),
+        ),
+    ]
@@ -1,13 +1,16 @@
 from collections import defaultdict
+from datetime import datetime
 from functools import reduce
-from operator import and_
+from operator import and_, or_
 from random import randint
+from typing import List, Optional, Tuple
 from urllib.parse import urljoin
 
 from django.core.exceptions import ValidationError
 from django.core.validators import URLValidator
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q
+from django.db.models.signals import post_save
 from django.utils import timezone
 
 from argus.auth.models import User
@@ -49,9 +52,10 @@ def create_fake_incident(tags=None, description=None, stateful=True):
     if tags:
         tags = [tag.split("=", 1) for tag in tags]
         taglist.extend(tags)
-    for k, v in taglist:
-        tag, _ = Tag.objects.get_or_create(key=k, value=v)
-        IncidentTagRelation.objects.create(tag=tag, incident=incident, added_by=argus_user)
+    tags = Tag.objects.get_or_create_many({"key": k, "value": v} for k, v in taglist)
+    IncidentTagRelation.objects.bulk_create(
+        [IncidentTagRelation(tag=tag, incident=incident, added_by=argus_user) for tag in tags]
+    )
     return incident
 
 
@@ -101,6 +105,15 @@ class TagQuerySet(models.QuerySet):
         key, value = Tag.split(tag)
         return self.create(key=key, value=value)
 
+    def get_or_create_many(self, tags_data):
+        "Return a list of the tags matching the key/value dicts in `tags_data`, creating those that don't exist"
+        key_value_pairs = {(tag_data["key"], tag_data["value"]) for tag_data in tags_data}
+        if not key_value_pairs:
+            return []
+        self.bulk_create([Tag(key=k, value=v) for k, v in key_value_pairs], ignore_conflicts=True)
+        # Objects created with `ignore_conflicts=True` are not given a pk, so they have to be fetched
+        return list(self.filter(reduce(or_, (Q(key=k, value=v) for k, v in key_value_pairs))))
+
 
 class Tag(models.Model):
     TAG_DELIMITER = "="
@@ -150,6 +163,9 @@ class IncidentQuerySet(models.QuerySet):
     def update(self, **kwargs):
         """
         This should not be used, as it doesn't call `save()`, which breaks things like the ws (WebSocket) app.
+
+        The only exception is `_set_end_time_in_batches()` (used by `set_open()` and `set_closed()`),
+        which calls `QuerySet.update()` directly and sends the `post_save` signals itself.
         """
         raise NotImplementedError()
 
@@ -159,11 +175,13 @@ class IncidentQuerySet(models.QuerySet):
     def stateless(self):
         return self.filter(end_time__isnull=True)
 
-    def open(self):
-        return self.filter(end_time__gt=timezone.now())
+    def open(self, as_of=None):
+        "Pass `as_of` to compare against a fixed point in time, for instance to get consistent results when paging"
+        return self.filter(end_time__gt=as_of or timezone.now())
 
-    def closed(self):
-        return self.filter(end_time__lte=timezone.now())
+    def closed(self, as_of=None):
+        "Pass `as_of` to compare against a fixed point in time, for instance to get consistent results when paging"
+        return self.filter(end_time__lte=as_of or timezone.now())
 
     def acked(self):
         return self.filter(self._generate_acked_query()).distinct()
@@ -178,7 +196,64 @@ class IncidentQuerySet(models.QuerySet):
         return self.filter(ticket_url="")
 
     def prefetch_default_related(self):
-        return self.prefetch_related("incident_tag_relations__tag", "source__type")
+        # `source` and `source.type` are joined in, while the tag relations (and their tags) are prefetched
+        return self.select_related("source__type").prefetch_related("incident_tag_relations__tag")
+
+    def set_open(self, actor: User, send_signals=True):
+        """
+        Bulk version of `Incident.set_open()`, which skips the incidents in the queryset that are stateless or
+        already open. Returns the number of reopened incidents.
+        """
+        return self._set_end_time_in_batches(
+            self.stateful().closed(), INFINITY_REPR, actor, timezone.now(), Event.Type.REOPEN, send_signals
+        )
+
+    def set_closed(self, actor: User, send_signals=True):
+        """
+        Bulk version of `Incident.set_closed()`, which skips the incidents in the queryset that are stateless or
+        already closed. Returns the number of closed incidents.
+        """
+        now = timezone.now()
+        return self._set_end_time_in_batches(
+            self.stateful().open(as_of=now), now, actor, now, Event.Type.CLOSE, send_signals
+        )
+
+    def _set_end_time_in_batches(self, qs, end_time, actor, timestamp, event_type, send_signals, batch_size=500):
+        """
+        Set `end_time` and create an event of type `event_type` for every incident in `qs`, using one UPDATE and
+        one INSERT per batch of `batch_size` incidents instead of one `save()` per incident.
+
+        As `update()` doesn't call `save()` (which is why it's disabled on this queryset), the `post_save` signals
+        that `save()` would have sent - for the incidents and the created events - are sent explicitly, unless
+        `send_signals` is false. Only pass `send_signals=False` if nothing (like the ws app) needs to be notified.
+        """
+        # Fetch the pks up front, as updating `end_time` changes which incidents `qs` matches
+        incident_pks = list(qs.values_list("pk", flat=True))
+        batches = [incident_pks[i : i + batch_size] for i in range(0, len(incident_pks), batch_size)]
+        events = []
+        with transaction.atomic():
+            for batch in batches:
+                super(IncidentQuerySet, Incident.objects.filter(pk__in=batch)).update(end_time=end_time)
+                events += Event.objects.bulk_create(
+                    [Event(incident_id=pk, actor=actor, timestamp=timestamp, type=event_type) for pk in batch]
+                )
+
+        if send_signals:
+            # Sent after the transaction, as receivers may close the database connection (like
+            # `background_send_notifications_to_users()` does), which would roll back an unfinished transaction
+            for batch in batches:
+                for incident in Incident.objects.filter(pk__in=batch).prefetch_default_related():
+                    post_save.send(
+                        sender=Incident,
+                        instance=incident,
+                        created=False,
+                        update_fields=frozenset({"end_time"}),
+                        raw=False,
+                        using=self.db,
+                    )
+            for event in events:
+                post_save.send(sender=Event, instance=event, created=True, update_fields=None, raw=False, using=self.db)
+        return len(incident_pks)
 
     def from_tags(self, *tags):
         tag_qss = Tag.objects.parse(*tags)
@@ -226,6 +301,9 @@ class Incident(models.Model):
         help_text="URL to existing ticket in a ticketing system.",
     )
 
+    # Bound once, as `save()` can be called in a loop
+    _end_time_to_python = end_time.to_python
+
     objects = IncidentQuerySet.as_manager()
 
     class Meta:
@@ -236,6 +314,10 @@ class Incident(models.Model):
                 name="%(class)s_unique_source_incident_id_per_source",
             ),
         ]
+        indexes = [
+            # Used when checking whether stateful incidents are open or closed
+            models.Index(fields=["end_time"], condition=Q(end_time__isnull=False), name="incident_end_time_idx"),
+        ]
         ordering = ["-start_time"]
 
     def __str__(self):
@@ -244,7 +326,7 @@ class Incident(models.Model):
 
     def save(self, *args, **kwargs):
         # Parse and replace `end_time`, to avoid having to call `refresh_from_db()`
-        self.end_time = self._meta.get_field("end_time").to_python(self.end_time)
+        self.end_time = Incident._end_time_to_python(self.end_time)
         super().save(*args, **kwargs)
 
     @property
@@ -266,7 +348,12 @@ class Incident(models.Model):
 
     @property
     def incident_relations(self):
-        return IncidentRelation.objects.filter(Q(incident1=self) | Q(incident2=self))
+        # A UNION lets each branch use the index of its own column, which an OR of the two columns often can't.
+        # Note that the returned queryset can't be filtered further (or deleted from), only ordered, sliced and
+        # evaluated; filter `IncidentRelation.objects` directly for that.
+        relations_from = IncidentRelation.objects.filter(incident1=self)
+        relations_to = IncidentRelation.objects.filter(incident2=self).exclude(incident1=self)
+        return relations_from.union(relations_to, all=True)
 
     @property
     def start_event(self):
@@ -311,12 +398,17 @@ class Incident(models.Model):
         Event.objects.create(incident=self, actor=actor, timestamp=self.end_time, type=Event.Type.CLOSE)
 
     def create_ack(self, actor: User, timestamp=None, description="", expiration=None):
+        event = self.build_ack_event(actor, timestamp=timestamp, description=description)
+        event.save()
+        ack = Acknowledgement.objects.create(event=event, expiration=expiration)
+        return ack
+
+    def build_ack_event(self, actor: User, timestamp=None, description=""):
+        "Return an unsaved acknowledgement event for the incident"
         timestamp = timestamp if timestamp else timezone.now()
-        event = Event.objects.create(
+        return Event(
             incident=self, actor=actor, timestamp=timestamp, type=Event.Type.ACKNOWLEDGE, description=description
         )
-        ack = Acknowledgement.objects.create(event=event, expiration=expiration)
-        return ack
 
     def pp_details_url(self):
         "Merge Incident.details_url with Source.base_url"
@@ -376,10 +468,36 @@ class Event(models.Model):
         return f"'{self.get_type_display()}': {self.incident.description}, {self.actor} @ {self.timestamp}"
 
 
+class AcknowledgementQuerySet(models.QuerySet):
+    def create_with_events(self, events_and_expirations: List[Tuple[Event, Optional[datetime]]]):
+        """
+        Bulk version of `Incident.create_ack()`, taking pairs of an unsaved acknowledgement event
+        (see `Incident.build_ack_event()`) and the acknowledgement's expiration.
+
+        Creates all the events with one INSERT and all the acknowledgements with another. Requires a database backend
+        that returns the pks of bulk created objects, like PostgreSQL.
+        """
+        if not events_and_expirations:
+            return []
+        events, expirations = zip(*events_and_expirations)
+        with transaction.atomic():
+            events = Event.objects.bulk_create(events)
+            acks = self.bulk_create(
+                [Acknowledgement(event=event, expiration=expiration) for event, expiration in zip(events, expirations)]
+            )
+        # `bulk_create()` doesn't send any signals, but the events' `post_save` signal triggers notifications.
+        # Sent after the transaction, as the notification receiver closes the database connection.
+        for event in events:
+            post_save.send(sender=Event, instance=event, created=True, update_fields=None, raw=False, using=self.db)
+        return acks
+
+
 class Acknowledgement(models.Model):
     event = models.OneToOneField(to=Event, on_delete=models.PROTECT, primary_key=True, related_name="ack")
     expiration = models.DateTimeField(null=True, blank=True)
 
+    objects = AcknowledgementQuerySet.as_manager()
+
     class Meta:
         ordering = ["-event__timestamp"]
 
@@ -1,7 +1,8 @@
-from collections import OrderedDict
+from functools import lru_cache
 from typing import List
 
 from django.core.validators import URLValidator
+from django.db.models import prefetch_related_objects
 from django.utils import timezone
 
 from rest_framework import serializers
@@ -18,6 +19,18 @@ from .models import (
     SourceSystemType,
     Tag,
 )
+from .validators import validate_key
+
+
+_URL_VALIDATOR = URLValidator()
+_EVENT_TYPE_DISPLAY = dict(Event.Type.choices)
+
+
+# Cannot be a constant, because this module is imported (by `argus.ws.models`) before all models are loaded
+@lru_cache(maxsize=None)
+def _get_all_incident_field_names():
+    all_fields = frozenset(field.name for field in Incident._meta.get_fields())
+    return all_fields | {"pk"}  # for providing feedback (the default "pk" field is acually named "id")
 
 
 class SourceSystemTypeSerializer(serializers.ModelSerializer):
@@ -57,7 +70,7 @@ class IncidentTagRelationSerializer(serializers.ModelSerializer):
         key = key.strip()
         if not key:  # Django doesn't attempt validating empty values
             raise serializers.ValidationError("The tag's key must not be empty")
-        Tag._meta.get_field("key").run_validators(key)
+        validate_key(key)
         # Reassemble tag, to enforce key without leading or trailing whitespace (by calling `strip()` above)
         return Tag.join(key, value_)
 
@@ -76,7 +89,10 @@ class IncidentTagRelationSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance: IncidentTagRelation):
         tag_repr = super().to_representation(instance)
-        tag_repr["tag"] = instance.tag.representation
+        # Same as `Tag.representation`, but without the overhead of the property and the call to `Tag.join()`,
+        # as this is run for every tag of every serialized incident
+        tag = instance.tag
+        tag_repr["tag"] = f"{tag.key}{Tag.TAG_DELIMITER}{tag.value}"
         return tag_repr
 
 
@@ -114,11 +130,12 @@ class IncidentSerializer(serializers.ModelSerializer):
         user = validated_data.pop("user")
 
         tags_data = validated_data.pop("tags")
-        tags = {Tag.objects.get_or_create(**tag_data)[0] for tag_data in tags_data}
+        tags = Tag.objects.get_or_create_many(tags_data)
 
         incident = Incident.objects.create(**validated_data)
-        for tag in tags:
-            IncidentTagRelation.objects.create(tag=tag, incident=incident, added_by=user)
+        IncidentTagRelation.objects.bulk_create(
+            [IncidentTagRelation(tag=tag, incident=incident, added_by=user) for tag in tags]
+        )
 
         return incident
 
@@ -131,7 +148,7 @@ class IncidentSerializer(serializers.ModelSerializer):
     def to_representation(self, instance: Incident):
         incident_repr = super().to_representation(instance)
 
-        tags_field: IncidentTagRelationSerializer = self.get_fields()["tags"]
+        tags_field: IncidentTagRelationSerializer = self.fields["tags"]
         incident_repr["tags"] = tags_field.to_representation(instance.incident_tag_relations.all())
 
         incident_repr["details_url"] = instance.pp_details_url()
@@ -142,8 +159,7 @@ class IncidentSerializer(serializers.ModelSerializer):
         return incident_repr
 
     def validate_ticket_url(self, value):
-        validator = URLValidator()
-        validator(value)
+        _URL_VALIDATOR(value)
         return value
 
     def validate(self, attrs: dict):
@@ -176,41 +192,39 @@ class IncidentPureDeserializer(serializers.ModelSerializer):
 
     @staticmethod
     def add_and_remove_tags(instance: Incident, user: User, tags_data: List[dict]):
-        posted_tags = {Tag.objects.get_or_create(**tag_data)[0] for tag_data in tags_data}
-
-        existing_tag_relations = instance.incident_tag_relations.select_related("tag")
-        existing_tags = {tag_relation.tag for tag_relation in existing_tag_relations}
-        remove_tag_relations = [
-            tag_relation for tag_relation in existing_tag_relations if tag_relation.tag not in posted_tags
-        ]
-        add_tags = posted_tags - existing_tags
+        posted_tag_ids = {tag.pk for tag in Tag.objects.get_or_create_many(tags_data)}
+        existing_tag_ids = set(instance.incident_tag_relations.values_list("tag_id", flat=True))
+        remove_tag_relations = instance.incident_tag_relations.filter(tag_id__in=existing_tag_ids - posted_tag_ids)
+        add_tag_ids = posted_tag_ids - existing_tag_ids
 
         if not user.is_superuser:
-            errors = {}
-            for tag_relation in remove_tag_relations:
-                if tag_relation.added_by != user:
-                    errors[str(tag_relation.tag)] = "Cannot remove this tag when you're not the one who added it."
+            errors = {
+                str(tag_relation.tag): "Cannot remove this tag when you're not the one who added it."
+                for tag_relation in remove_tag_relations.exclude(added_by=user).select_related("tag")
+            }
             if errors:
                 raise serializers.ValidationError(errors)
 
-        for tag_relation in remove_tag_relations:
-            tag_relation.delete()
-            # XXX: remove tag object as well if no incident is connected to it?
+        remove_tag_relations.delete()
+        # XXX: remove tag object as well if no incident is connected to it?
 
-        for tag in add_tags:
-            IncidentTagRelation.objects.create(tag=tag, incident=instance, added_by=user)
+        IncidentTagRelation.objects.bulk_create(
+            [IncidentTagRelation(tag_id=tag_id, incident=instance, added_by=user) for tag_id in add_tag_ids]
+        )
 
     def to_representation(self, instance: Incident):
-        return IncidentSerializer(instance).data
+        # Fetch the tag relations and their tags in one go, instead of one query per tag.
+        # Note that this doesn't refetch an already filled prefetch cache; the views' `UpdateModelMixin` clears it
+        # after updating, as the prefetched tags would otherwise be stale.
+        prefetch_related_objects([instance], "incident_tag_relations__tag")
+        return IncidentSerializer(instance, context=self.context).data
 
     def validate_empty_values(self, data: dict):
-        allowed_fields = self.get_fields()
-        all_fields = {field.name for field in Incident._meta.get_fields()}
-        all_fields.add("pk")  # for providing feedback (the default "pk" field is acually named "id")
+        allowed_fields = self.fields
         errors = {}
         for field in data:
             if field not in allowed_fields:
-                if field in all_fields:
+                if field in _get_all_incident_field_names():
                     error_message = "The field is not allowed to be changed."
                 else:
                     error_message = "The field does not exist."
@@ -221,7 +235,8 @@ class IncidentPureDeserializer(serializers.ModelSerializer):
         return super().validate_empty_values(data)
 
     def validate_ticket_url(self, value):
-        return IncidentSerializer().validate_ticket_url(value)
+        _URL_VALIDATOR(value)
+        return value
 
 
 class EventSerializer(serializers.ModelSerializer):
@@ -255,14 +270,27 @@ class EventSerializer(serializers.ModelSerializer):
     def to_representation(self, instance: Event):
         event_repr = super().to_representation(instance)
 
-        type_tuples = [
-            ("value", instance.type),
-            ("display", instance.get_type_display()),
-        ]
-        event_repr["type"] = OrderedDict(type_tuples)
+        event_repr["type"] = {
+            "value": instance.type,
+            "display": _EVENT_TYPE_DISPLAY.get(instance.type, instance.type),
+        }
         return event_repr
 
 
+class AcknowledgementListSerializer(serializers.ListSerializer):
+    def create(self, validated_data: List[dict]):
+        events_and_expirations = []
+        for ack_data in validated_data:
+            assert "incident" in ack_data
+            assert "actor" in ack_data
+            event_data = ack_data["event"]
+            event = ack_data["incident"].build_ack_event(
+                ack_data["actor"], timestamp=event_data["timestamp"], description=event_data.get("description", "")
+            )
+            events_and_expirations.append((event, ack_data.get("expiration", None)))
+        return Acknowledgement.objects.create_with_events(events_and_expirations)
+
+
 class AcknowledgementSerializer(serializers.ModelSerializer):
     event = EventSerializer()
 
@@ -275,6 +303,7 @@ class AcknowledgementSerializer(serializers.ModelSerializer):
         ]
         # "pk" needs to be listed, as "event" is the actual primary key
         read_only_fields = ["pk"]
+        list_serializer_class = AcknowledgementListSerializer
 
     def create(self, validated_data: dict):
         assert "incident" in validated_data
@@ -170,7 +170,7 @@ class IncidentViewSet(
 
     pagination_class = IncidentPagination
     permission_classes = [IsAuthenticated]
-    queryset = Incident.objects.prefetch_default_related().prefetch_related("source")
+    queryset = Incident.objects.prefetch_default_related()
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = IncidentFilter
 
@@ -252,7 +252,7 @@ class EventViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, mixins.Retrie
     def get_queryset(self):
         incident_pk = self.kwargs["incident_pk"]
         incident = get_object_or_404(Incident.objects.all(), pk=incident_pk)
-        return incident.events.all()
+        return incident.events.select_related("actor")
 
     def perform_create(self, serializer: EventSerializer):
         user = self.request.user
@@ -331,7 +331,7 @@ class AcknowledgementViewSet(
     def get_queryset(self):
         incident_pk = self.kwargs["incident_pk"]
         incident = get_object_or_404(Incident.objects.all(), pk=incident_pk)
-        return incident.acks
+        return incident.acks.select_related("event__actor")
 
     def perform_create(self, serializer: AcknowledgementSerializer):
         user = self.request.user
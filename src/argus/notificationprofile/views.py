@@ -42,7 +42,9 @@ class NotificationProfileViewSet(rw_viewsets.ModelViewSet):
     queryset = NotificationProfile.objects.none()
 
     def get_queryset(self):
-        return self.request.user.notification_profiles.all()
+        return self.request.user.notification_profiles.select_related("timeslot", "phone_number").prefetch_related(
+            "timeslot__time_recurrences", "filters"
+        )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -100,7 +102,7 @@ class TimeslotViewSet(viewsets.ModelViewSet):
     queryset = Timeslot.objects.none()
 
     def get_queryset(self):
-        return self.request.user.timeslots.all()
+        return self.request.user.timeslots.prefetch_related("time_recurrences")
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
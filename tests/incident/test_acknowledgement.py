@@ -0,0 +1,42 @@
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, RequestFactory
+from django.utils import timezone
+
+from argus.incident.factories import IncidentFactory
+from argus.incident.models import Acknowledgement, Event
+from argus.incident.serializers import AcknowledgementSerializer
+from argus.util.testing import disconnect_signals, connect_signals
+from . import IncidentBasedAPITestCaseHelper
+
+
+# `Acknowledgement.objects.create_with_events()` needs the pks of bulk created events, which e.g. SQLite doesn't return
+@skipUnless(connection.features.can_return_rows_from_bulk_insert, "requires a backend like PostgreSQL")
+class AcknowledgementListSerializerTestCase(TestCase, IncidentBasedAPITestCaseHelper):
+    def setUp(self):
+        disconnect_signals()
+        super().init_test_objects()
+        self.incident1 = IncidentFactory(source=self.source1)
+
+    def tearDown(self):
+        connect_signals()
+
+    def test_create_many_creates_events_and_acknowledgements(self):
+        timestamp = timezone.now()
+        data = [
+            {"event": {"timestamp": timestamp, "description": "Ack 1"}},
+            {"event": {"timestamp": timestamp, "description": "Ack 2"}, "expiration": timestamp + timedelta(days=1)},
+        ]
+        request = RequestFactory().post(f"/api/v1/incidents/{self.incident1.pk}/acks/")
+        request.user = self.user1
+        serializer = AcknowledgementSerializer(data=data, many=True, context={"request": request})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        acks = serializer.save(incident=self.incident1, actor=self.user1)
+
+        self.assertEqual(len(acks), 2)
+        self.assertEqual(Acknowledgement.objects.count(), 2)
+        events = Event.objects.filter(incident=self.incident1, type=Event.Type.ACKNOWLEDGE)
+        self.assertEqual(set(events.values_list("description", flat=True)), {"Ack 1", "Ack 2"})
+        self.assertEqual(Acknowledgement.objects.get(event__description="Ack 2").expiration, data[1]["expiration"])
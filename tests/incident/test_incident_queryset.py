@@ -0,0 +1,109 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from argus.auth.factories import SourceUserFactory
+from argus.incident.factories import *
+from argus.incident.models import Event, Incident, IncidentTagRelation
+from argus.util.testing import disconnect_signals, connect_signals
+
+
+class PrefetchDefaultRelatedTestCase(TestCase):
+    def setUp(self):
+        disconnect_signals()
+        source_type = SourceSystemTypeFactory(name="nav")
+        source_user = SourceUserFactory(username="nav1")
+        self.source = SourceSystemFactory(name="NAV 1", type=source_type, user=source_user)
+        for _ in range(5):
+            incident = IncidentFactory(source=self.source)
+            for _ in range(2):
+                IncidentTagRelation.objects.create(tag=TagFactory(), incident=incident, added_by=source_user)
+
+    def tearDown(self):
+        connect_signals()
+
+    def test_number_of_queries_does_not_depend_on_number_of_incidents(self):
+        # One query for incidents joined with source and source type, one for tag relations and one for tags
+        with self.assertNumQueries(3):
+            for incident in Incident.objects.prefetch_default_related():
+                str(incident.source.type)
+                [str(tag) for tag in incident.tags]
+
+
+class IncidentQuerySetOpenAndClosedAsOfTestCase(TestCase):
+    def setUp(self):
+        disconnect_signals()
+        source_type = SourceSystemTypeFactory(name="nav")
+        source_user = SourceUserFactory(username="nav1")
+        source = SourceSystemFactory(name="NAV 1", type=source_type, user=source_user)
+        self.as_of = timezone.now() - timedelta(days=7)
+        self.ended_before = IncidentFactory(source=source, end_time=self.as_of - timedelta(hours=1))
+        self.ended_after = IncidentFactory(source=source, end_time=self.as_of + timedelta(hours=1))
+        IncidentFactory(source=source, end_time=None)
+
+    def tearDown(self):
+        connect_signals()
+
+    def test_open_and_closed_split_incidents_at_as_of(self):
+        self.assertEqual(list(Incident.objects.open(as_of=self.as_of)), [self.ended_after])
+        self.assertEqual(list(Incident.objects.closed(as_of=self.as_of)), [self.ended_before])
+        # Without `as_of`, both incidents have ended
+        self.assertFalse(Incident.objects.open().exists())
+        self.assertEqual(Incident.objects.closed().count(), 2)
+
+
+class IncidentQuerySetSetOpenAndClosedTestCase(TestCase):
+    def setUp(self):
+        disconnect_signals()
+        source_type = SourceSystemTypeFactory(name="nav")
+        self.source_user = SourceUserFactory(username="nav1")
+        source = SourceSystemFactory(name="NAV 1", type=source_type, user=self.source_user)
+        self.open_incident1 = IncidentFactory(source=source)
+        self.open_incident2 = IncidentFactory(source=source)
+        self.stateless_incident = IncidentFactory(source=source, end_time=None)
+
+    def tearDown(self):
+        connect_signals()
+
+    def test_set_closed_closes_open_incidents_and_creates_close_events(self):
+        self.assertEqual(Incident.objects.all().set_closed(self.source_user), 2)
+        self.assertFalse(Incident.objects.open().exists())
+        self.assertIsNone(Incident.objects.get(pk=self.stateless_incident.pk).end_time)
+        for incident in (self.open_incident1, self.open_incident2):
+            self.assertTrue(incident.events.filter(type=Event.Type.CLOSE).exists())
+
+    def test_set_open_reopens_closed_incidents_and_creates_reopen_events(self):
+        Incident.objects.all().set_closed(self.source_user)
+        self.assertEqual(Incident.objects.all().set_open(self.source_user), 2)
+        self.assertEqual(Incident.objects.open().count(), 2)
+        for incident in (self.open_incident1, self.open_incident2):
+            self.assertTrue(incident.events.filter(type=Event.Type.REOPEN).exists())
+
+
+class IncidentQuerySetSetClosedWithSignalsTestCase(TransactionTestCase):
+    def setUp(self):
+        # Other test cases may have left the notification signal disconnected
+        connect_signals()
+        source_type = SourceSystemTypeFactory(name="nav")
+        self.source_user = SourceUserFactory(username="nav1")
+        source = SourceSystemFactory(name="NAV 1", type=source_type, user=self.source_user)
+        self.incident1 = IncidentFactory(source=source)
+        self.incident2 = IncidentFactory(source=source)
+
+    # Like the real function, close the database connections, but don't fork a process for sending notifications
+    @patch(
+        "argus.incident.signals.background_send_notifications_to_users",
+        side_effect=lambda event: connections.close_all(),
+    )
+    def test_set_closed_sends_signals_without_rolling_back_changes(self, mock_send_notifications):
+        self.assertEqual(Incident.objects.all().set_closed(self.source_user), 2)
+
+        self.assertFalse(Incident.objects.open().exists())
+        close_events = Event.objects.filter(type=Event.Type.CLOSE)
+        self.assertEqual(close_events.count(), 2)
+        notified_events = {call.args[0] for call in mock_send_notifications.call_args_list}
+        notified_close_events = {event for event in notified_events if event.type == Event.Type.CLOSE}
+        self.assertEqual(notified_close_events, set(close_events))
@@ -0,0 +1,34 @@
+from django.test import TestCase
+
+from argus.auth.factories import SourceUserFactory
+from argus.incident.factories import *
+from argus.incident.models import IncidentRelation, IncidentRelationType
+from argus.util.testing import disconnect_signals, connect_signals
+
+
+class IncidentRelationsTestCase(TestCase):
+    def setUp(self):
+        disconnect_signals()
+        source_type = SourceSystemTypeFactory(name="nav")
+        source_user = SourceUserFactory(username="nav1")
+        source = SourceSystemFactory(name="NAV 1", type=source_type, user=source_user)
+        self.incident1 = IncidentFactory(source=source)
+        self.incident2 = IncidentFactory(source=source)
+        self.incident3 = IncidentFactory(source=source)
+        self.relation_type = IncidentRelationType.objects.create(name="related")
+
+    def tearDown(self):
+        connect_signals()
+
+    def _create_relation(self, incident1, incident2):
+        return IncidentRelation.objects.create(incident1=incident1, incident2=incident2, type=self.relation_type)
+
+    def test_incident_relations_includes_relations_in_both_directions_and_self_relations_once(self):
+        relation_from = self._create_relation(self.incident1, self.incident2)
+        relation_to = self._create_relation(self.incident3, self.incident1)
+        self_relation = self._create_relation(self.incident1, self.incident1)
+        self._create_relation(self.incident2, self.incident3)
+
+        relations = list(self.incident1.incident_relations)
+        self.assertEqual(len(relations), 3)
+        self.assertEqual(set(relations), {relation_from, relation_to, self_relation})
@@ -0,0 +1,22 @@
+from django.test import TestCase
+
+from argus.incident.factories import TagFactory
+from argus.incident.models import Tag
+
+
+class TagGetOrCreateManyTestCase(TestCase):
+    def test_returns_existing_and_newly_created_tags(self):
+        existing_tag = TagFactory(key="location", value="argus")
+        tags_data = [
+            {"key": "location", "value": "argus"},
+            {"key": "object", "value": "1"},
+            {"key": "object", "value": "1"},
+        ]
+        tags = Tag.objects.get_or_create_many(tags_data)
+        self.assertEqual(len(tags), 2)
+        self.assertIn(existing_tag, tags)
+        self.assertTrue(Tag.objects.filter(key="object", value="1").exists())
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_empty_tags_data_returns_empty_list(self):
+        self.assertEqual(Tag.objects.get_or_create_many([]), [])
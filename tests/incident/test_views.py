@@ -3,15 +3,18 @@ from datetime import datetime, timedelta
 from django.core.exceptions import ValidationError
 from django.test import TestCase, RequestFactory
 from django.utils import timezone
+from django.urls import reverse
 from django.utils.timezone import is_aware, make_aware
 
-from rest_framework import serializers, versioning
+from rest_framework import serializers, status, versioning
+from rest_framework.test import APIClient, APITestCase
 
-from argus.auth.factories import SourceUserFactory
+from argus.auth.factories import PersonUserFactory, SourceUserFactory
 from argus.incident.factories import *
-from argus.incident.models import Event
+from argus.incident.models import Event, IncidentTagRelation
 from argus.incident.views import EventViewSet
 from argus.util.testing import disconnect_signals, connect_signals
+from . import IncidentBasedAPITestCaseHelper
 
 
 class EventViewSetTestCase(TestCase):
@@ -34,3 +37,57 @@ class EventViewSetTestCase(TestCase):
         view.request = request
         with self.assertRaises(serializers.ValidationError):
             view.validate_event_type_for_incident(Event.Type.ACKNOWLEDGE, incident)
+
+
+class IncidentViewSetUpdateTestCase(APITestCase, IncidentBasedAPITestCaseHelper):
+    def setUp(self):
+        disconnect_signals()
+        super().init_test_objects()
+        self.incident = IncidentFactory(source=self.source1)
+        self.incident_url = reverse("v1:incident:incident-detail", args=[self.incident.pk])
+        self.source1_tag = TagFactory(key="location", value="source1")
+        IncidentTagRelation.objects.create(tag=self.source1_tag, incident=self.incident, added_by=self.source1_user)
+
+    def tearDown(self):
+        connect_signals()
+
+    @staticmethod
+    def _tags_of_response(response):
+        return {tag_dict["tag"] for tag_dict in response.data["tags"]}
+
+    def test_patching_tags_and_ticket_url_returns_updated_incident(self):
+        ticket_url = "https://tickettracker.example.com/tickets/1"
+        data = {"tags": [{"tag": "location=source1"}, {"tag": "object=1"}], "ticket_url": ticket_url}
+        response = self.user1_rest_client.patch(self.incident_url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["pk"], self.incident.pk)
+        self.assertEqual(response.data["ticket_url"], ticket_url)
+        self.assertEqual(self._tags_of_response(response), {"location=source1", "object=1"})
+        self.incident.refresh_from_db()
+        self.assertEqual(self.incident.ticket_url, ticket_url)
+
+    def test_superuser_can_replace_tags_added_by_others(self):
+        response = self.user1_rest_client.patch(self.incident_url, {"tags": [{"tag": "object=1"}]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._tags_of_response(response), {"object=1"})
+        self.assertEqual({str(tag) for tag in self.incident.tags}, {"object=1"})
+
+    def test_non_superuser_cannot_remove_tags_added_by_others(self):
+        user2_rest_client = APIClient()
+        user2_rest_client.force_authenticate(user=PersonUserFactory(username="user2"))
+        response = user2_rest_client.patch(self.incident_url, {"tags": [{"tag": "object=1"}]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("location=source1", response.data)
+        self.assertEqual({str(tag) for tag in self.incident.tags}, {"location=source1"})
+
+    def test_non_superuser_can_add_tags_and_remove_their_own_tags(self):
+        response = self.source1_rest_client.patch(self.incident_url, {"tags": [{"tag": "object=1"}]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._tags_of_response(response), {"object=1"})
+        tag_relation = self.incident.incident_tag_relations.get()
+        self.assertEqual(str(tag_relation.tag), "object=1")
+        self.assertEqual(tag_relation.added_by, self.source1_user)